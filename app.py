@@ -2,7 +2,7 @@
 import os
 import re
 import json
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
@@ -13,11 +13,14 @@ from langchain_core.output_parsers import StrOutputParser
 import requests # Import the requests library
 
 # Custom modules
-from seriousness_detector import get_seriousness_level
+from seriousness_detector import analyze_seriousness
 from suggestions_manager import get_recovery_suggestions, format_suggestions
-from emergency_contacts import get_emergency_info_by_location, format_contacts_for_display
-from university_auth import authenticate_student, get_university_resources
+from emergency_contacts import get_emergency_info_by_location, format_contacts_for_display, get_nearest_cities_with_contacts, get_city_coordinates, get_country_anchor, CONTACT_CATEGORIES
+from university_auth import authenticate_student, get_university_resources, suggest_universities
 from voice_input import recognize_speech_from_audio
+from traffic_capture import install_capture
+from prompt_registry import get_prompt, count_tokens
+from mood_timeline import MoodTimeline, MOOD_DB_FILE
 
 # Simple user storage (in production, use a proper database)
 def get_registered_users():
@@ -49,6 +52,23 @@ app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY') or 'dev_fallback_secret
 app.config['UPLOAD_FOLDER'] = 'uploads'
 if not os.path.exists(app.config['UPLOAD_FOLDER']):
     os.makedirs(app.config['UPLOAD_FOLDER'])
+# Record sanitized API traffic for replay when TRAFFIC_CAPTURE_FILE is set
+traffic_recorder = install_capture(app)
+
+# Keep-alive HTTP session for upstream API calls (recreated in each gunicorn worker)
+http_session = requests.Session()
+
+# Per-user mood events with incrementally maintained daily/weekly rollups
+# (compaction runs in its own process, see gunicorn.conf.py)
+mood_timeline = MoodTimeline(os.getenv('MOOD_DB_FILE', MOOD_DB_FILE))
+
+def init_worker_resources():
+    """Recreate per-process resources after a fork; called from gunicorn's post_fork hook."""
+    global http_session
+    http_session = requests.Session()
+    if traffic_recorder is not None:
+        traffic_recorder.after_fork()
+    mood_timeline.after_fork()
 # --- Helpers ---
 def contains_any_word(text: str, keywords: list[str]) -> bool:
     """Return True if any keyword is present as a whole word in text (case-insensitive)."""
@@ -66,6 +86,40 @@ def contains_any_token(text: str, keywords: list[str]) -> bool:
             return True
     return False
 
+# Crisis messages always get the same safety response, served locally without an
+# upstream call so it can never be softened or delayed by the LLM. This pattern
+# catches phrasings the seriousness detector does not rate as Emergency.
+CRISIS_PATTERN = re.compile(
+    r"\b(suicide|suicidal|kill myself|end my life|ending my life|take my own life|end it all|want to die|"
+    r"hurt myself|hurting myself)\b",
+    re.IGNORECASE
+)
+CRISIS_RESPONSE = ("I'm so sorry you're feeling this way, and I want you to know that you're not alone. These feelings are incredibly serious, and I need you to reach out for immediate help. Please call the National Suicide Prevention Lifeline at 988 or 1-800-273-8255 right now, or text HOME to 741741. You matter, and there are people who want to help you through this.")
+
+# Other recognised topics only add a short hint to the LLM prompt, so the reply
+# still fits the message (e.g. a user asking how to support a depressed friend).
+TOPIC_HINTS = [
+    (re.compile(r"\b(period pain|periods|menstrual|menstruation|cramps|pms)\b", re.IGNORECASE),
+     "period pain; validate it, suggest a heating pad, warm bath or gentle stretching, and a healthcare provider if it is severe."),
+    (re.compile(r"\b(anxiety|anxious)\b", re.IGNORECASE),
+     "anxiety; remind them the feelings are temporary and offer a breathing exercise or to talk through the cause."),
+    (re.compile(r"\b(sad|sadness|lonely|depressed|depression)\b", re.IGNORECASE),
+     "sadness or depression; validate the feelings and gently ask whether they have someone close to talk to."),
+]
+
+def get_crisis_response(user_message: str, seriousness_level: str):
+    """Return the fixed crisis response for Emergency-level or self-harm messages, else None."""
+    if seriousness_level == "Emergency" or CRISIS_PATTERN.search(user_message):
+        return CRISIS_RESPONSE
+    return None
+
+def get_topic_hint(user_message: str):
+    """Return the LLM hint for the first recognised topic in the message, or None."""
+    for pattern, hint in TOPIC_HINTS:
+        if pattern.search(user_message):
+            return hint
+    return None
+
 def generate_contextual_response(user_message: str) -> str:
     """Keyword-based compassionate responses when LLM is unavailable."""
     if contains_any_word(user_message, ['anxious', 'anxiety', 'worried', 'nervous']) or contains_any_token(user_message, ['anxious', 'anxiety', 'worried', 'nervous']):
@@ -106,6 +160,32 @@ def generate_contextual_response(user_message: str) -> str:
     return ("I'm here to listen and support you. I can sense that you're going through something important. "
             "Would you like to share a bit more so we can figure out a next small step together?")
 
+def collect_contacts(country: str, city: str, category: str) -> list:
+    """Return the contacts for a location; category 'all' merges every category."""
+    if category != 'all':
+        return get_emergency_info_by_location(country, city, category)
+    all_contacts = []
+    for cat in CONTACT_CATEGORIES:
+        # Copy rather than tag the shared dataset entries in place
+        contacts = get_emergency_info_by_location(country, city, cat)
+        all_contacts.extend(dict(contact, category=cat) for contact in contacts)
+    return all_contacts
+
+def is_known_category(category) -> bool:
+    """Return True if category is "all" or one of the contact categories."""
+    return isinstance(category, str) and (category == 'all' or category in CONTACT_CATEGORIES)
+
+def format_nearby_contacts(nearby_cities: list, category: str, show_distance: bool = True) -> str:
+    """Format contacts for each nearby city as one markdown string, nearest first."""
+    sections = []
+    for entry in nearby_cities:
+        contacts = collect_contacts(entry['country'], entry['city'], category)
+        location = f"{entry['city']}, {entry['country']}"
+        if show_distance:
+            location += f" (~{entry['distance_km']:.0f} km away)"
+        sections.append(format_contacts_for_display(contacts, location))
+    return "\n".join(sections) if sections else "No information found nearby."
+
 # --- Routes for HTML pages ---
 @app.route('/')
 def home():
@@ -243,33 +323,24 @@ def chat_api():
         user_message = data.get('message') or data.get('user_input')
         history = data.get('history', [])
         
-        # --- LLM Integration ---
-        # The prompt for the LLM
-        prompt = f"""
-        You are CalmMateAI, a compassionate and empathetic mental well-being assistant. Your role is to provide supportive, personalized, and helpful responses to users who are seeking emotional support.
-
-        User's message: "{user_message}"
-
-        IMPORTANT: If the user mentions any of these specific topics, provide targeted responses:
-
-        - PERIOD PAIN/MENSTRUAL ISSUES: "I'm so sorry you're experiencing period pain. This can be incredibly difficult and debilitating. Have you tried using a heating pad, taking a warm bath, or gentle stretching? If the pain is severe or interfering with your daily activities, please consider reaching out to a healthcare provider - there are treatments that can help. You're not alone in this, and your pain is valid."
-
-        - SUICIDE/CRISIS: "I'm so sorry you're feeling this way, and I want you to know that you're not alone. These feelings are incredibly serious, and I need you to reach out for immediate help. Please call the National Suicide Prevention Lifeline at 988 or 1-800-273-8255 right now, or text HOME to 741741. You matter, and there are people who want to help you through this."
-
-        - ANXIETY: "I can hear that you're feeling anxious right now, and that's completely understandable. Anxiety can feel overwhelming, but remember that these feelings are temporary. Would you like to try some deep breathing exercises together, or would you prefer to talk more about what's causing your anxiety?"
-
-        - SADNESS/DEPRESSION: "I'm so sorry you're feeling sad and lonely. It takes courage to reach out when you're feeling this way. You're not alone in this, and your feelings are completely valid. Have you been able to talk to anyone close to you about how you're feeling?"
-
-        For all other messages, provide a warm, empathetic, and contextual response that:
-        1. Acknowledges their specific feelings and situation
-        2. Shows genuine understanding and empathy
-        3. Offers practical, supportive advice when appropriate
-        4. Encourages them to seek professional help if needed
-        5. Uses a warm, conversational tone
-        6. Avoids generic responses - be specific to their situation
-
-        Keep your response conversational and not too long (2-4 sentences). Be supportive but not overly clinical.
-        """
+        # Score the message first so every Emergency-level message gets the local crisis reply
+        seriousness = analyze_seriousness(user_message, qa_chain_for_llm_check=None)
+        seriousness_level = seriousness['level']
+
+        # Crisis replies are served locally; everything else goes upstream
+        crisis_response = get_crisis_response(user_message, seriousness_level)
+        if crisis_response:
+            seriousness_level = "Emergency"
+        chat_prompt = get_prompt("chat_system")
+        system_prompt = chat_prompt.render()
+        system_tokens = chat_prompt.token_count
+        topic_hint = get_topic_hint(user_message)
+        if topic_hint:
+            hint_text = get_prompt("chat_topic_hint").render(hint=topic_hint)
+            system_prompt = f"{system_prompt}\n{hint_text}"
+            system_tokens += count_tokens(hint_text)
+        input_tokens = 0
+        input_tokens_source = 'none'
 
         # Check for API key first
         api_key = os.getenv("GROQ_API_KEY") # Using Groq API key
@@ -279,7 +350,9 @@ def chat_api():
         user_message_lower = user_message.lower()
         
         # Treat placeholder keys as not configured
-        if (not api_key) or ("your_groq_api_key" in api_key.lower()) or (api_key.lower().startswith("your_")):
+        if crisis_response:
+            ai_response = crisis_response
+        elif (not api_key) or ("your_groq_api_key" in api_key.lower()) or (api_key.lower().startswith("your_")):
             print("Using fallback responses - API key not configured properly")
             ai_response = generate_contextual_response(user_message)
         else:
@@ -289,9 +362,13 @@ def chat_api():
             payload = {
                 "model": "llama-3.1-8b-instant",
                 "messages": [
+                    {
+                        "role": "system",
+                        "content": system_prompt
+                    },
                     {
                         "role": "user",
-                        "content": prompt
+                        "content": user_message
                     }
                 ],
                 "temperature": 0.7,
@@ -303,11 +380,17 @@ def chat_api():
                 "Content-Type": "application/json"
             }
             
+            input_tokens = system_tokens + count_tokens(user_message)
+            input_tokens_source = 'estimate'
             try:
-                response = requests.post(api_url, headers=headers, data=json.dumps(payload))
+                response = http_session.post(api_url, headers=headers, data=json.dumps(payload))
                 response.raise_for_status() # Raise an exception for bad status codes
                 result = response.json()
                 ai_response = result['choices'][0]['message']['content']
+                # Prefer the upstream count when the API reports usage
+                if 'prompt_tokens' in result.get('usage', {}):
+                    input_tokens = result['usage']['prompt_tokens']
+                    input_tokens_source = 'upstream'
                 print(f"Groq API Success: {ai_response[:100]}...")  # Debug log
             except Exception as e:
                 print(f"Groq API Error: {str(e)}")  # Debug log
@@ -316,8 +399,17 @@ def chat_api():
                 # Fall back to contextual responses if API call fails
                 ai_response = generate_contextual_response(user_message)
 
-        # Get seriousness level and suggestions using the imported modules
-        seriousness_level = get_seriousness_level(user_message, qa_chain_for_llm_check=None)
+        g.input_tokens = input_tokens
+        g.input_tokens_source = input_tokens_source
+        print(f"Chat metrics: prompt={chat_prompt.name} v{chat_prompt.version} "
+              f"input_tokens={input_tokens} ({input_tokens_source})")
+
+        user_email = session.get('user_email')
+        if user_email:
+            try:
+                mood_timeline.record_event(user_email, seriousness_level, seriousness['compound'], seriousness['triggers'])
+            except Exception as e:
+                print(f"Error recording mood event: {e}")
         suggestions_list = get_recovery_suggestions(seriousness_level)
         formatted_suggestions = format_suggestions(suggestions_list)
         
@@ -337,6 +429,29 @@ def chat_api():
             'suggestions': 'Consider talking to a trusted friend, family member, or mental health professional. Practice self-care activities like deep breathing, meditation, or going for a walk.'
         }), 200
 
+@app.route('/api/mood_timeline', methods=['GET'])
+def mood_timeline_api():
+    """
+    API endpoint returning the logged-in user's mood trend from precomputed rollups.
+    """
+    user_email = session.get('user_email')
+    if not user_email:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    period = request.args.get('period', 'day')
+    if period not in ('day', 'week'):
+        return jsonify({'error': "period must be 'day' or 'week'."}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 30)), 1), 366)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number.'}), 400
+    
+    return jsonify({
+        'timeline': mood_timeline.get_timeline(user_email, period, limit),
+        'top_triggers': [{'trigger': t, 'hits': hits} for t, hits in mood_timeline.get_top_triggers(user_email)],
+        'alert': mood_timeline.get_alert_summary(user_email)
+    })
+
 @app.route('/api/contacts', methods=['POST'])
 def contacts_api():
     """
@@ -350,23 +465,36 @@ def contacts_api():
         
         if not country or not city:
             return jsonify({'error': 'Country and city are required.'}), 400
+        if not isinstance(country, str) or not isinstance(city, str):
+            return jsonify({'error': 'Country and city must be strings.'}), 400
+        category = category or 'helplines'
+        if not is_known_category(category):
+            return jsonify({'error': 'Unknown category.'}), 400
         
         # Get the contacts using the imported module
-        if category == 'all':
-            # Get all categories for the location
-            all_contacts = []
-            categories = ['helplines', 'doctors', 'domestic_violence', 'substance_abuse']
-            for cat in categories:
-                contacts = get_emergency_info_by_location(country, city, cat)
-                for contact in contacts:
-                    contact['category'] = cat
-                all_contacts.extend(contacts)
-        else:
-            all_contacts = get_emergency_info_by_location(country, city, category)
+        all_contacts = collect_contacts(country, city, category)
         
         # Format the contacts into a markdown string for display
         formatted_contacts_markdown = format_contacts_for_display(all_contacts, f"{city}, {country}")
         
+        # Never leave the user empty-handed: fall back to the nearest city that has
+        # contacts in this category, measured from the requested city when it is listed
+        if not all_contacts:
+            origin = get_city_coordinates(country, city)
+            show_distance = origin is not None
+            origin = origin or get_country_anchor(country)
+            if origin:
+                nearby_cities = get_nearest_cities_with_contacts(*origin, category, k=1, exclude={(country, city)})
+                if nearby_cities:
+                    if show_distance:
+                        notice = f"No contacts in this category are listed for {city}, {country}."
+                    else:
+                        notice = f"{city}, {country} is not in our directory yet."
+                    formatted_contacts_markdown = (
+                        f"{notice} Showing the nearest city that has them.\n\n"
+                        + format_nearby_contacts(nearby_cities, category, show_distance)
+                    )
+        
         return jsonify({
             'contacts_markdown': formatted_contacts_markdown
         })
@@ -374,6 +502,56 @@ def contacts_api():
         print(f"Error in contacts_api: {e}")
         return jsonify({'error': 'Failed to retrieve contacts.', 'details': str(e)}), 500
 
+@app.route('/api/contacts/nearby', methods=['POST'])
+def contacts_nearby_api():
+    """
+    API endpoint to retrieve emergency contacts for the cities nearest to a location.
+    Accepts either lat/lon or a country and city; an unknown city falls back to its country.
+    """
+    try:
+        data = request.get_json()
+        category = data.get('category') or 'helplines'
+        if not is_known_category(category):
+            return jsonify({'error': 'Unknown category.'}), 400
+        k = min(max(int(data.get('k', 3)), 1), 10)
+        lat, lon = data.get('lat'), data.get('lon')
+        # Distances are only meaningful when measured from the user's own location
+        show_distance = True
+        
+        if lat is None or lon is None:
+            country = data.get('country')
+            city = data.get('city')
+            if not country:
+                return jsonify({'error': 'Either lat/lon or a country is required.'}), 400
+            if not isinstance(country, str) or not isinstance(city, (str, type(None))):
+                return jsonify({'error': 'Country and city must be strings.'}), 400
+            location = city and get_city_coordinates(country, city)
+            if not location:
+                location = get_country_anchor(country)
+                show_distance = False
+            if not location:
+                return jsonify({'error': 'Location not found. Please share your coordinates.'}), 404
+            lat, lon = location
+        
+        lat, lon = float(lat), float(lon)
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return jsonify({'error': 'Coordinates are out of range.'}), 400
+        
+        nearby_cities = get_nearest_cities_with_contacts(lat, lon, category, k)
+        if not show_distance:
+            # Measured from the country's anchor city, not the user, so not worth reporting
+            nearby_cities = [dict(entry, distance_km=None) for entry in nearby_cities]
+        
+        return jsonify({
+            'cities': nearby_cities,
+            'contacts_markdown': format_nearby_contacts(nearby_cities, category, show_distance)
+        })
+    except (TypeError, ValueError):
+        return jsonify({'error': 'lat, lon and k must be numbers.'}), 400
+    except Exception as e:
+        print(f"Error in contacts_nearby_api: {e}")
+        return jsonify({'error': 'Failed to retrieve nearby contacts.', 'details': str(e)}), 500
+
 @app.route('/api/contacts/search', methods=['POST'])
 def contacts_search_api():
     """
@@ -412,12 +590,16 @@ def university_resources_api():
         resources = get_university_resources(university_name)
         
         if not resources:
-            return jsonify({'error': 'University not found or no resources available.'}), 404
+            # Close spellings are offered back to the user, never served in place of the request
+            return jsonify({
+                'error': 'University not found or no resources available.',
+                'suggestions': suggest_universities(university_name)
+            }), 404
             
         return jsonify({'resources': resources})
     except Exception as e:
         print(f"Error in university_resources_api: {e}")
-        if seriousness_level == "Emergency": return jsonify({'error': 'Failed to retrieve university resources.', 'details': str(e)}), 500
+        return jsonify({'error': 'Failed to retrieve university resources.', 'details': str(e)}), 500
 
 if __name__ == '__main__':
     # Get the port from the environment, defaulting to 5001
@@ -3,6 +3,8 @@
 import json
 import os
 
+from spatial_index import GeoIndex
+
 # Define the path to the data file
 DATA_FILE = os.path.join(os.path.dirname(__file__), 'emergency_data.json')
 
@@ -14,6 +16,45 @@ except FileNotFoundError:
     print(f"Error: The data file '{DATA_FILE}' was not found.")
     EMERGENCY_DATA = {}
 
+def build_city_index(emergency_data):
+    """
+    Builds a spatial index over every city that has coordinates.
+
+    Args:
+        emergency_data (dict): The loaded emergency data, keyed by country then city.
+
+    Returns:
+        GeoIndex: An index whose items are (country, city) tuples.
+    """
+    entries = []
+    for country, cities in emergency_data.items():
+        for city, city_info in cities.items():
+            coordinates = city_info.get('coordinates')
+            if coordinates:
+                entries.append((coordinates['lat'], coordinates['lon'], (country, city)))
+    return GeoIndex(entries)
+
+# Build the index once at load time so nearest-city lookups are O(log n)
+CITY_INDEX = build_city_index(EMERGENCY_DATA)
+
+# Contact categories a city entry may hold; other keys (e.g. "coordinates") are metadata
+CONTACT_CATEGORIES = ('helplines', 'doctors', 'domestic_violence', 'substance_abuse')
+
+# Common country name variations
+COUNTRY_VARIATIONS = {
+    'korea': 'South Korea',
+    'south korea': 'South Korea',
+    's. korea': 'South Korea',
+    'usa': 'United States',
+    'u.s.a': 'United States',
+    'us': 'United States',
+    'united states': 'United States',
+    'uk': 'United Kingdom',
+    'u.k.': 'United Kingdom',
+    'united kingdom': 'United Kingdom',
+    'canada': 'Canada',
+}
+
 def get_available_countries():
     """Returns a list of all countries available in the data."""
     return sorted(list(EMERGENCY_DATA.keys()))
@@ -37,24 +78,12 @@ def get_emergency_info_by_location(country, city, category):
     Returns:
         list: A list of dictionaries containing contact info. Returns an empty list if not found.
     """
-    # Common country name variations
-    country_variations = {
-        'korea': 'South Korea',
-        'south korea': 'South Korea',
-        's. korea': 'South Korea',
-        'usa': 'United States',
-        'u.s.a': 'United States',
-        'us': 'United States',
-        'united states': 'United States',
-        'uk': 'United Kingdom',
-        'u.k.': 'United Kingdom',
-        'united kingdom': 'United Kingdom',
-        'canada': 'Canada',
-    }
+    if category not in CONTACT_CATEGORIES:
+        return []
     
     # Normalize country name
     country_lower = country.lower().strip()
-    country_normalized = country_variations.get(country_lower, country).title().strip()
+    country_normalized = COUNTRY_VARIATIONS.get(country_lower, country).title().strip()
     city_normalized = city.title().strip()
     
     # Try exact match first
@@ -71,6 +100,96 @@ def get_emergency_info_by_location(country, city, category):
     
     return city_data.get(category, [])
 
+def get_nearest_cities(lat, lon, k=3):
+    """
+    Finds the k cities with contact information closest to a location.
+
+    Args:
+        lat (float): Latitude in degrees.
+        lon (float): Longitude in degrees.
+        k (int): The number of cities to return.
+
+    Returns:
+        list: Dictionaries with "country", "city" and "distance_km", nearest first.
+    """
+    return [
+        {'country': country, 'city': city, 'distance_km': round(distance, 1)}
+        for distance, (country, city) in CITY_INDEX.nearest(lat, lon, k)
+    ]
+
+def get_nearest_cities_with_contacts(lat, lon, category, k=1, exclude=()):
+    """
+    Finds the k nearest cities that list at least one contact in a category.
+
+    Args:
+        lat (float): Latitude in degrees.
+        lon (float): Longitude in degrees.
+        category (str): A contact category, or 'all' for any category.
+        k (int): The number of cities to return.
+        exclude (tuple): (country, city) pairs to skip, e.g. the city already shown.
+
+    Returns:
+        list: Dictionaries with "country", "city" and "distance_km", nearest first.
+    """
+    categories = CONTACT_CATEGORIES if category == 'all' else (category,)
+    found = []
+    # Widen the search until enough cities with contacts are found
+    fetch = k + len(exclude) + 4
+    while True:
+        candidates = get_nearest_cities(lat, lon, fetch)
+        found = [
+            entry for entry in candidates
+            if (entry['country'], entry['city']) not in exclude
+            and any(EMERGENCY_DATA[entry['country']][entry['city']].get(cat) for cat in categories)
+        ]
+        if len(found) >= k or fetch >= CITY_INDEX.size:
+            return found[:k]
+        fetch *= 2
+
+def get_city_coordinates(country, city):
+    """
+    Looks up the coordinates of a listed city (case-insensitive).
+
+    Args:
+        country (str): The country name or a common variation of it.
+        city (str): The city name.
+
+    Returns:
+        tuple: (lat, lon), or None if the city is not in the data.
+    """
+    country_lower = country.lower().strip()
+    country_normalized = COUNTRY_VARIATIONS.get(country_lower, country).strip().lower()
+    for data_country, cities in EMERGENCY_DATA.items():
+        if data_country.lower() == country_normalized:
+            for data_city, city_info in cities.items():
+                coordinates = city_info.get('coordinates')
+                if data_city.lower() == city.lower().strip() and coordinates:
+                    return coordinates['lat'], coordinates['lon']
+    return None
+
+def get_country_anchor(country):
+    """
+    Returns the coordinates of a country's first listed city, used when the city is unknown.
+
+    The first listed city is the country's main hub in the data, which is a
+    better stand-in than a centroid that may fall far from any listed city.
+
+    Args:
+        country (str): The country name or a common variation of it.
+
+    Returns:
+        tuple: (lat, lon), or None if the country has no cities with coordinates.
+    """
+    country_lower = country.lower().strip()
+    country_normalized = COUNTRY_VARIATIONS.get(country_lower, country).strip().lower()
+    for data_country, cities in EMERGENCY_DATA.items():
+        if data_country.lower() == country_normalized:
+            for city_info in cities.values():
+                coordinates = city_info.get('coordinates')
+                if coordinates:
+                    return coordinates['lat'], coordinates['lon']
+    return None
+
 def format_contacts_for_display(contacts, location):
     """
     Formats a list of contact dictionaries into a Markdown string for display.
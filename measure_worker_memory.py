@@ -0,0 +1,161 @@
+# measure_worker_memory.py
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Warm-up traffic that exercises the shared state: chat routing, VADER and the
+# prompt registry, the emergency dataset and KD-tree, and the university lookup
+WARMUP_REQUESTS = [
+    ('/api/chat', {'message': 'I have been feeling stressed and tired about exams'}),
+    ('/api/chat', {'message': 'I feel anxious and alone tonight'}),
+    ('/api/chat', {'message': 'Can you suggest a way to relax before sleep?'}),
+    ('/api/contacts', {'country': 'South Korea', 'city': 'Seoul', 'category': 'all'}),
+    ('/api/contacts', {'country': 'Canada', 'city': 'Ottawa', 'category': 'helplines'}),
+    ('/api/contacts/nearby', {'lat': 35.8, 'lon': 128.6, 'k': 3}),
+    ('/api/contacts/nearby', {'lat': -1.3, 'lon': 36.8, 'k': 3, 'category': 'doctors'}),
+    ('/api/university_resources', {'university_name': 'Stanford University'}),
+    ('/api/university_resources', {'university_name': 'University of Oxford'}),
+]
+
+
+def read_memory_kb(pid):
+    """
+    Reads a process's memory breakdown from /proc (Linux only).
+
+    Args:
+        pid (int): The process ID.
+
+    Returns:
+        dict: "rss", "pss" and "uss" (unique set size: private clean + dirty) in kB.
+    """
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'uss': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def child_pids(parent_pid):
+    """Returns the PIDs of the direct children of a process."""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # The command name may contain spaces, so split after its closing parenthesis
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent_pid:
+            children.append(int(entry))
+    return children
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure(workers, preload, warmup_requests, startup_timeout):
+    """
+    Starts gunicorn with the repo config and measures each worker's memory.
+
+    Args:
+        workers (int): Number of gunicorn workers.
+        preload (bool): Whether to run in preload-and-freeze mode.
+        warmup_requests (int): Rounds of WARMUP_REQUESTS sent before measuring so every
+            worker touches the data it uses under real traffic.
+        startup_timeout (float): Seconds to wait for all workers to boot.
+
+    Returns:
+        dict: Mean per-worker RSS, PSS and USS in kB, plus the master's RSS.
+    """
+    port = free_port()
+    # No API key keeps /api/chat on the local path; the mood store goes to a scratch file
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers),
+               GUNICORN_PRELOAD='1' if preload else '0', GROQ_API_KEY='',
+               MOOD_DB_FILE=os.path.join(tempfile.gettempdir(), f'mood_timeline_measure_{port}.db'))
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '--config', 'gunicorn.conf.py'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        deadline = time.time() + startup_timeout
+        while True:
+            if master.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with code {master.returncode}")
+            if time.time() > deadline:
+                raise RuntimeError("timed out waiting for workers to start")
+            try:
+                urllib.request.urlopen(f'{base_url}/api/test', timeout=2).read()
+                if len(child_pids(master.pid)) >= workers:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.5)
+
+        def post(item):
+            path, body = item
+            request = urllib.request.Request(
+                base_url + path, data=json.dumps(body).encode('utf-8'),
+                headers={'Content-Type': 'application/json'}, method='POST',
+            )
+            try:
+                urllib.request.urlopen(request, timeout=30).read()
+            except OSError:
+                pass
+
+        # Send concurrently so the load is spread over all workers
+        batch = WARMUP_REQUESTS * workers * warmup_requests
+        with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+            list(pool.map(post, batch))
+        time.sleep(1)
+
+        samples = [read_memory_kb(pid) for pid in child_pids(master.pid)]
+        return {
+            'workers': len(samples),
+            'master_rss': read_memory_kb(master.pid)['rss'],
+            **{key: sum(s[key] for s in samples) / len(samples) for key in ('rss', 'pss', 'uss')},
+        }
+    finally:
+        master.send_signal(signal.SIGTERM)
+        try:
+            master.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            master.kill()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report per-worker unique memory with and without preload.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 8, 16])
+    parser.add_argument('--warmup', type=int, default=20, help="Warm-up request rounds before measuring")
+    parser.add_argument('--startup-timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7}  {'mode':<10} {'rss/worker':>12} {'pss/worker':>12} {'uss/worker':>12} {'total uss':>12}")
+    for count in args.workers:
+        for preload in (False, True):
+            result = measure(count, preload, args.warmup, args.startup_timeout)
+            mode = 'preload' if preload else 'per-worker'
+            print(f"{count:>7}  {mode:<10} "
+                  f"{result['rss'] / 1024:>9.1f} MB {result['pss'] / 1024:>9.1f} MB "
+                  f"{result['uss'] / 1024:>9.1f} MB {result['uss'] * result['workers'] / 1024:>9.1f} MB")
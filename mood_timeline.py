@@ -0,0 +1,363 @@
+# mood_timeline.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+# Default database location; override with MOOD_DB_FILE
+MOOD_DB_FILE = os.path.join(os.path.dirname(__file__), 'mood_timeline.db')
+
+LEVELS = ("Low", "Medium", "High", "Emergency")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mood_events (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    level TEXT NOT NULL,
+    compound REAL NOT NULL,
+    triggers TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mood_events_user_ts ON mood_events (user_id, ts);
+CREATE INDEX IF NOT EXISTS idx_mood_events_ts ON mood_events (ts);
+
+CREATE TABLE IF NOT EXISTS mood_rollups (
+    user_id TEXT NOT NULL,
+    period TEXT NOT NULL,          -- 'day' or 'week'
+    bucket TEXT NOT NULL,          -- '2026-10-19' or '2026-W42'
+    messages INTEGER NOT NULL,
+    compound_sum REAL NOT NULL,
+    compound_min REAL NOT NULL,
+    low INTEGER NOT NULL,
+    medium INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    emergency INTEGER NOT NULL,
+    PRIMARY KEY (user_id, period, bucket)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS mood_trigger_rollups (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    trigger TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day, trigger)
+) WITHOUT ROWID;
+"""
+
+ROLLUP_UPSERT = """
+INSERT INTO mood_rollups (user_id, period, bucket, messages, compound_sum, compound_min,
+                          low, medium, high, emergency)
+VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, period, bucket) DO UPDATE SET
+    messages = messages + 1,
+    compound_sum = compound_sum + excluded.compound_sum,
+    compound_min = MIN(compound_min, excluded.compound_min),
+    low = low + excluded.low,
+    medium = medium + excluded.medium,
+    high = high + excluded.high,
+    emergency = emergency + excluded.emergency
+"""
+
+TRIGGER_UPSERT = """
+INSERT INTO mood_trigger_rollups (user_id, day, trigger, hits) VALUES (?, ?, ?, 1)
+ON CONFLICT (user_id, day, trigger) DO UPDATE SET hits = hits + 1
+"""
+
+
+def day_bucket(ts):
+    """Returns the UTC day bucket for a timestamp, e.g. "2026-10-19"."""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def week_bucket(ts):
+    """Returns the ISO week bucket for a timestamp, e.g. "2026-W42"."""
+    year, week, _ = datetime.fromtimestamp(ts, tz=timezone.utc).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class MoodTimeline:
+    """
+    Append-only per-user mood events with daily and weekly rollups.
+
+    Each write appends the raw event and updates the rollups in the same
+    transaction, so dashboard and alert queries read one row per day or week
+    instead of re-scoring a user's whole history. Connections are opened lazily
+    per thread and per process, so a preloading gunicorn master holds none for
+    its workers to inherit.
+    """
+
+    def __init__(self, path=MOOD_DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        # Create the schema on a throwaway connection; request threads open their own
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def after_fork(self):
+        """Forgets connections inherited from the parent so the worker opens its own."""
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record_event(self, user_id, level, compound, triggers, ts=None):
+        """
+        Appends one scored message and updates its rollups.
+
+        Args:
+            user_id (str): The user the message belongs to.
+            level (str): The seriousness level.
+            compound (float): The VADER compound score.
+            triggers (list): The matched trigger keywords.
+            ts (float): Unix timestamp; defaults to now.
+        """
+        self.record_events([(user_id, ts if ts is not None else time.time(), level, compound, triggers)])
+
+    def record_events(self, events):
+        """
+        Appends a batch of events in one transaction.
+
+        Args:
+            events (list): (user_id, ts, level, compound, triggers) tuples.
+        """
+        event_rows = []
+        rollup_rows = []
+        trigger_rows = []
+        for user_id, ts, level, compound, triggers in events:
+            day = day_bucket(ts)
+            level_counts = [int(level == name) for name in LEVELS]
+            event_rows.append((user_id, ts, level, compound, json.dumps(triggers)))
+            rollup_rows.append((user_id, 'day', day, compound, compound, *level_counts))
+            rollup_rows.append((user_id, 'week', week_bucket(ts), compound, compound, *level_counts))
+            trigger_rows.extend((user_id, day, trigger) for trigger in triggers)
+
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT INTO mood_events (user_id, ts, level, compound, triggers) VALUES (?, ?, ?, ?, ?)',
+                event_rows,
+            )
+            conn.executemany(ROLLUP_UPSERT, rollup_rows)
+            conn.executemany(TRIGGER_UPSERT, trigger_rows)
+
+    def get_timeline(self, user_id, period='day', limit=30):
+        """
+        Reads the most recent rollups for a user, oldest first.
+
+        Args:
+            user_id (str): The user.
+            period (str): 'day' or 'week'.
+            limit (int): The number of buckets to return.
+
+        Returns:
+            list: One dict per bucket with message count, average and minimum
+                compound score, and a count per seriousness level.
+        """
+        rows = self._connect().execute(
+            """SELECT bucket, messages, compound_sum, compound_min, low, medium, high, emergency
+               FROM mood_rollups WHERE user_id = ? AND period = ?
+               ORDER BY bucket DESC LIMIT ?""",
+            (user_id, period, limit),
+        ).fetchall()
+        timeline = []
+        for bucket, messages, compound_sum, compound_min, *level_counts in reversed(rows):
+            timeline.append({
+                'bucket': bucket,
+                'messages': messages,
+                'avg_compound': round(compound_sum / messages, 4),
+                'min_compound': compound_min,
+                'levels': dict(zip(LEVELS, level_counts)),
+            })
+        return timeline
+
+    def get_top_triggers(self, user_id, days=30, limit=5):
+        """Returns the most frequent triggers for a user over recent days as (trigger, hits) pairs."""
+        # Today counts as the first day, so the window covers exactly `days` buckets
+        since = day_bucket(time.time() - (days - 1) * 86400)
+        return self._connect().execute(
+            """SELECT trigger, SUM(hits) AS total FROM mood_trigger_rollups
+               WHERE user_id = ? AND day >= ? GROUP BY trigger ORDER BY total DESC LIMIT ?""",
+            (user_id, since, limit),
+        ).fetchall()
+
+    def get_alert_summary(self, user_id, days=7):
+        """
+        Summarizes recent days for counselor alerts, reading only daily rollups.
+
+        Args:
+            user_id (str): The user.
+            days (int): The window to summarize.
+
+        Returns:
+            dict: Level counts, average compound score and whether to alert.
+        """
+        # Today counts as the first day, so the window covers exactly `days` buckets
+        since = day_bucket(time.time() - (days - 1) * 86400)
+        row = self._connect().execute(
+            """SELECT COALESCE(SUM(messages), 0), COALESCE(SUM(compound_sum), 0),
+                      COALESCE(SUM(high), 0), COALESCE(SUM(emergency), 0)
+               FROM mood_rollups WHERE user_id = ? AND period = 'day' AND bucket >= ?""",
+            (user_id, since),
+        ).fetchone()
+        messages, compound_sum, high, emergency = row
+        avg_compound = compound_sum / messages if messages else 0.0
+        return {
+            'days': days,
+            'messages': messages,
+            'high': high,
+            'emergency': emergency,
+            'avg_compound': round(avg_compound, 4),
+            'alert': emergency > 0 or high >= 3 or (messages >= 5 and avg_compound <= -0.5),
+        }
+
+    def compact(self, retention_days=90, batch_size=10000):
+        """
+        Drops raw events older than the retention window.
+
+        Rollups already hold the aggregates for those days, so trends stay
+        intact while the event log stays small. Deletes run in short batches
+        so concurrent chat writes are never blocked for long.
+
+        Args:
+            retention_days (int): How many days of raw events to keep.
+            batch_size (int): Events deleted per transaction.
+
+        Returns:
+            int: The number of events removed.
+        """
+        cutoff = time.time() - retention_days * 86400
+        conn = self._connect()
+        removed = 0
+        while True:
+            with conn:
+                deleted = conn.execute(
+                    """DELETE FROM mood_events WHERE id IN
+                       (SELECT id FROM mood_events WHERE ts < ? LIMIT ?)""",
+                    (cutoff, batch_size),
+                ).rowcount
+            removed += deleted
+            if deleted < batch_size:
+                break
+        if removed:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return removed
+
+
+def run_compaction_loop(timeline, retention_days=90, interval_seconds=6 * 3600):
+    """
+    Runs MoodTimeline.compact every `interval_seconds` until interrupted.
+
+    This is meant to run as a single process per deployment (gunicorn starts
+    one from its master when MOOD_RETENTION_DAYS is set), never inside the web
+    workers.
+
+    Args:
+        timeline (MoodTimeline): The store to compact.
+        retention_days (int): How many days of raw events to keep.
+        interval_seconds (float): Time between compaction runs.
+    """
+    while True:
+        try:
+            removed = timeline.compact(retention_days)
+            if removed:
+                print(f"Mood timeline compaction removed {removed} events")
+        except sqlite3.Error as e:
+            print(f"Mood timeline compaction failed: {e}")
+        time.sleep(interval_seconds)
+
+
+def run_benchmark(path, total_events, users, days, batch_size):
+    """Loads synthetic events and compares rollup reads with re-scanning raw events."""
+    import random
+
+    rng = random.Random(7)
+    if os.path.exists(path):
+        os.remove(path)
+    timeline = MoodTimeline(path)
+    triggers_pool = ['stressed', 'tired', 'anxious', 'sad', 'hopeless', 'alone']
+    now = time.time()
+
+    started = time.perf_counter()
+    batch = []
+    for _ in range(total_events):
+        level = rng.choices(LEVELS, weights=(70, 20, 9, 1))[0]
+        triggers = rng.sample(triggers_pool, rng.randint(0, 2))
+        ts = now - rng.random() * days * 86400
+        batch.append((f"user{rng.randrange(users)}", ts, level, rng.uniform(-1, 1), triggers))
+        if len(batch) >= batch_size:
+            timeline.record_events(batch)
+            batch = []
+    if batch:
+        timeline.record_events(batch)
+    write_s = time.perf_counter() - started
+
+    conn = timeline._connect()
+    sample_users = [f"user{i}" for i in range(min(users, 50))]
+
+    started = time.perf_counter()
+    for user_id in sample_users:
+        timeline.get_timeline(user_id, 'day', days)
+        timeline.get_alert_summary(user_id)
+    rollup_ms = (time.perf_counter() - started) / len(sample_users) * 1000
+
+    started = time.perf_counter()
+    for user_id in sample_users:
+        daily = {}
+        for ts, compound, level in conn.execute(
+                'SELECT ts, compound, level FROM mood_events WHERE user_id = ?', (user_id,)):
+            bucket = daily.setdefault(day_bucket(ts), [0, 0.0])
+            bucket[0] += 1
+            bucket[1] += compound
+    scan_ms = (time.perf_counter() - started) / len(sample_users) * 1000
+
+    per_user = total_events / users
+    print(f"events={total_events} users={users} days={days} (~{per_user:.0f} events/user)")
+    print(f"write:        {total_events / write_s:,.0f} events/s ({write_s:.1f}s, batch={batch_size})")
+    print(f"rollup read:  {rollup_ms:.2f} ms/user (daily timeline + alert summary)")
+    print(f"event scan:   {scan_ms:.2f} ms/user (re-aggregating raw events)")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mood timeline maintenance and benchmarks.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compact_parser = subparsers.add_parser('compact', help="Drop raw events older than the retention window")
+    compact_parser.add_argument('--db', default=os.getenv('MOOD_DB_FILE', MOOD_DB_FILE))
+    compact_parser.add_argument('--retention-days', type=int, default=90)
+    compact_parser.add_argument('--interval-hours', type=float, default=0,
+                                help="Keep running and compact at this interval instead of once")
+
+    bench_parser = subparsers.add_parser('bench', help="Benchmark writes and reads on synthetic events")
+    bench_parser.add_argument('--db', default='mood_timeline_bench.db')
+    bench_parser.add_argument('--events', type=int, default=2_000_000)
+    bench_parser.add_argument('--users', type=int, default=1000)
+    bench_parser.add_argument('--days', type=int, default=365)
+    bench_parser.add_argument('--batch-size', type=int, default=1000)
+
+    args = parser.parse_args()
+    if args.command == 'compact' and args.interval_hours > 0:
+        try:
+            run_compaction_loop(MoodTimeline(args.db), args.retention_days, args.interval_hours * 3600)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'compact':
+        removed = MoodTimeline(args.db).compact(args.retention_days)
+        print(f"Removed {removed} events older than {args.retention_days} days")
+    else:
+        run_benchmark(args.db, args.events, args.users, args.days, args.batch_size)
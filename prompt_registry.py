@@ -0,0 +1,126 @@
+# prompt_registry.py
+
+import re
+import string
+import textwrap
+
+# Counts are estimates: the upstream model (Llama) uses its own tokenizer. When
+# the optional tiktoken package is installed its cl100k encoding is used;
+# otherwise a regex split that tracks BPE token counts for English text.
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def count_tokens(text):
+    """
+    Estimates the tokens in a piece of text using a local tokenizer.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+class CompiledPrompt:
+    """
+    A named, versioned prompt compiled once at registration.
+
+    The template text is dedented and stripped so indentation from the source
+    file is never sent upstream, and its static token count is measured once.
+    """
+
+    def __init__(self, name, version, template):
+        self.name = name
+        self.version = version
+        self.text = textwrap.dedent(template).strip()
+        self.fields = tuple(
+            field for _, field, _, _ in string.Formatter().parse(self.text) if field
+        )
+        self.token_count = count_tokens(self.text)
+
+    def render(self, **values):
+        """Fills in the template fields; a template without fields is returned as is."""
+        if not self.fields:
+            return self.text
+        return self.text.format(**values)
+
+    def __repr__(self):
+        return f"CompiledPrompt({self.name!r}, v{self.version}, {self.token_count} tokens)"
+
+
+# Registry of compiled prompts, keyed by name and then version
+PROMPTS = {}
+
+
+def register_prompt(name, version, template):
+    """
+    Compiles and registers a prompt template.
+
+    Args:
+        name (str): The prompt name.
+        version (int): The prompt version; higher versions supersede lower ones.
+        template (str): The template text, using str.format fields.
+
+    Returns:
+        CompiledPrompt: The compiled template.
+    """
+    prompt = CompiledPrompt(name, version, template)
+    PROMPTS.setdefault(name, {})[version] = prompt
+    return prompt
+
+
+def get_prompt(name, version=None):
+    """
+    Retrieves a compiled prompt, defaulting to its latest version.
+
+    Args:
+        name (str): The prompt name.
+        version (int): A specific version, or None for the latest.
+
+    Returns:
+        CompiledPrompt: The compiled template.
+
+    Raises:
+        KeyError: If the name or version is not registered.
+    """
+    versions = PROMPTS[name]
+    if version is None:
+        version = max(versions)
+    return versions[version]
+
+
+# --- Built-in prompts ---
+register_prompt("chat_system", 1, """
+    You are CalmMateAI, a compassionate and empathetic mental well-being assistant.
+    Reply to the user's message with a warm, conversational response that:
+    1. Acknowledges their specific feelings and situation
+    2. Offers practical, supportive advice when appropriate
+    3. Encourages professional help if needed
+    Keep it to 2-4 sentences, specific to their situation, supportive but not clinical.
+""")
+
+register_prompt("chat_system", 2, """
+    You are CalmMateAI, a compassionate and empathetic mental well-being assistant.
+    Reply to the user's message with a warm, conversational response that:
+    1. Acknowledges their specific feelings and situation
+    2. Offers practical, supportive advice when appropriate
+    3. Encourages professional help if needed
+    Keep it to 2-4 sentences, specific to their situation, supportive but not clinical.
+    If the user mentions suicide or self-harm, tell them to call or text 988, or text HOME to 741741, right away.
+""")
+
+register_prompt("chat_topic_hint", 1, """
+    Topic hint (use only if it fits what the user is actually saying): {hint}
+""")
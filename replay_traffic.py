@@ -0,0 +1,179 @@
+# replay_traffic.py
+
+import argparse
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+MIN_SPEED = 1.0
+MAX_SPEED = 50.0
+
+
+def load_capture(path):
+    """
+    Loads captured requests from a JSONL file, ordered by timestamp.
+
+    Args:
+        path (str): Path to a file written by traffic_capture.
+
+    Returns:
+        list: Captured records, skipping malformed lines and records without a path or numeric ts.
+    """
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if (isinstance(record, dict) and isinstance(record.get('path'), str)
+                    and isinstance(record.get('ts', 0), (int, float))):
+                records.append(record)
+    records.sort(key=lambda r: r.get('ts', 0))
+    return records
+
+
+def percentile(sorted_values, pct):
+    """Returns the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def replay(records, base_url, speed=1.0, concurrency=8, timeout=30):
+    """
+    Re-issues captured requests against a running instance.
+
+    Requests are sent at their original offsets divided by `speed`. At most
+    `concurrency` requests are in flight; when the limit is reached the
+    schedule slips rather than queueing unbounded work.
+
+    Args:
+        records (list): Captured records from load_capture.
+        base_url (str): Target server, e.g. "http://127.0.0.1:5001".
+        speed (float): Time compression factor between 1 and 50.
+        concurrency (int): Maximum number of in-flight requests.
+        timeout (float): Per-request timeout in seconds.
+
+    Returns:
+        dict: Summary with throughput, latency percentiles and error rate.
+    """
+    if not MIN_SPEED <= speed <= MAX_SPEED:
+        raise ValueError(f"speed must be between {MIN_SPEED:g} and {MAX_SPEED:g}")
+    if not records:
+        return summarize([], [], 0.0)
+
+    base_url = base_url.rstrip('/')
+    slots = threading.BoundedSemaphore(concurrency)
+    local = threading.local()
+    lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def send(record):
+        started = time.perf_counter()
+        try:
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = requests.Session()
+            response = session.request(
+                record.get('method', 'POST'),
+                base_url + record['path'],
+                json=record.get('body'),
+                timeout=timeout,
+            )
+            failed = response.status_code >= 500
+            outcome = response.status_code
+        except Exception as e:
+            # Any failure counts as an error; the future is never inspected
+            failed = True
+            outcome = type(e).__name__
+        finally:
+            # Always free the slot, or the scheduler deadlocks on acquire()
+            slots.release()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed_ms)
+            if failed:
+                errors.append(outcome)
+
+    first_ts = records[0].get('ts', 0)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            due = (record.get('ts', first_ts) - first_ts) / speed
+            delay = due - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            slots.acquire()
+            pool.submit(send, record)
+    wall_seconds = time.perf_counter() - start
+    return summarize(latencies, errors, wall_seconds)
+
+
+def summarize(latencies, errors, wall_seconds):
+    """Builds the replay report from raw latencies (ms) and error outcomes."""
+    ordered = sorted(latencies)
+    total = len(ordered)
+    error_counts = {}
+    for outcome in errors:
+        error_counts[str(outcome)] = error_counts.get(str(outcome), 0) + 1
+    return {
+        'requests': total,
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_rps': round(total / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(ordered, 50), 2),
+            'p90': round(percentile(ordered, 90), 2),
+            'p99': round(percentile(ordered, 99), 2),
+            'max': round(ordered[-1], 2) if ordered else 0.0,
+        },
+        'error_rate': round(len(errors) / total, 4) if total else 0.0,
+        'errors': error_counts,
+    }
+
+
+def format_report(summary):
+    """Formats a replay summary as plain text for the terminal."""
+    latency = summary['latency_ms']
+    lines = [
+        f"Requests:    {summary['requests']} in {summary['wall_seconds']}s",
+        f"Throughput:  {summary['throughput_rps']} req/s",
+        f"Latency ms:  p50={latency['p50']} p90={latency['p90']} p99={latency['p99']} max={latency['max']}",
+        f"Error rate:  {summary['error_rate'] * 100:.2f}%",
+    ]
+    for outcome, count in sorted(summary['errors'].items()):
+        lines.append(f"  {outcome}: {count}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured CalmMateAI traffic against a running instance.")
+    parser.add_argument('capture_file', help="JSONL file written with TRAFFIC_CAPTURE_FILE set")
+    parser.add_argument('--url', default='http://127.0.0.1:5001', help="Base URL of the target instance")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed multiplier (1-50)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Maximum in-flight requests")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if not MIN_SPEED <= args.speed <= MAX_SPEED:
+        parser.error(f"--speed must be between {MIN_SPEED:g} and {MAX_SPEED:g}")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    records = load_capture(args.capture_file)
+    summary = replay(records, args.url, args.speed, args.concurrency, args.timeout)
+    print(json.dumps(summary, indent=2) if args.json else format_report(summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,53 @@ except nltk.downloader.DownloadError:
 # Initialize VADER sentiment analyzer
 analyzer = SentimentIntensityAnalyzer()
 
+# Keyword patterns are compiled once at import so they are shared by preloaded workers
+EMERGENCY_KEYWORDS = re.compile(
+    r'\b(suicide|kill myself|end my life|die|self-harm|harm myself|cutting|overdose|in danger|i need help now)\b',
+    re.IGNORECASE
+)
+HIGH_KEYWORDS = re.compile(
+    r"\b(hopeless|worthless|can't go on|give up|no purpose|can't take it anymore|lost|alone|trapped|scared|crisis|panic attack|anxious|depressed|depression|extreme pain|severe pain|unbearable pain|debilitating pain)\b",
+    re.IGNORECASE
+)
+MEDIUM_KEYWORDS = re.compile(
+    r'\b(stress|stressed|anxious|anxiety|sad|unhappy|tired|overwhelmed|struggling|bad day|tough time|feeling down)\b',
+    re.IGNORECASE
+)
+
+def find_triggers(user_input):
+    """
+    Returns the distinct keywords in a message that match any seriousness pattern.
+
+    Args:
+        user_input (str): The text message from the user.
+
+    Returns:
+        list: Lowercased matched keywords, in order of first appearance.
+    """
+    triggers = []
+    for pattern in (EMERGENCY_KEYWORDS, HIGH_KEYWORDS, MEDIUM_KEYWORDS):
+        triggers.extend(match.lower() for match in pattern.findall(user_input))
+    return list(dict.fromkeys(triggers))
+
+def analyze_seriousness(user_input, qa_chain_for_llm_check):
+    """
+    Scores a message and returns the details behind its seriousness level.
+
+    Args:
+        user_input (str): The text message from the user.
+        qa_chain_for_llm_check (LLMChain): A pre-initialized LangChain LLMChain object for the LLM check.
+
+    Returns:
+        dict: "level", the VADER "compound" score and the matched "triggers".
+    """
+    compound_score = analyzer.polarity_scores(user_input)['compound']
+    return {
+        'level': _classify(user_input, compound_score, qa_chain_for_llm_check),
+        'compound': compound_score,
+        'triggers': find_triggers(user_input),
+    }
+
 def get_seriousness_level(user_input, qa_chain_for_llm_check):
     """
     Analyzes the user's message to determine a seriousness level.
@@ -29,31 +76,17 @@ def get_seriousness_level(user_input, qa_chain_for_llm_check):
     Returns:
         str: The seriousness level ("Low", "Medium", "High", or "Emergency").
     """
-    
-    # --- Keyword and Pattern Matching (Rule-based) ---
-    emergency_keywords = re.compile(
-        r'\b(suicide|kill myself|end my life|die|self-harm|harm myself|cutting|overdose|in danger|i need help now)\b',
-        re.IGNORECASE
-    )
-    high_keywords = re.compile(
-        r"\b(hopeless|worthless|can't go on|give up|no purpose|can't take it anymore|lost|alone|trapped|scared|crisis|panic attack|anxious|depressed|depression|extreme pain|severe pain|unbearable pain|debilitating pain)\b",
-        re.IGNORECASE
-    )
-    medium_keywords = re.compile(
-        r'\b(stress|stressed|anxious|anxiety|sad|unhappy|tired|overwhelmed|struggling|bad day|tough time|feeling down)\b',
-        re.IGNORECASE
-    )
+    return analyze_seriousness(user_input, qa_chain_for_llm_check)['level']
 
-    if emergency_keywords.search(user_input):
+def _classify(user_input, compound_score, qa_chain_for_llm_check):
+    """Applies the keyword, sentiment and LLM rules to pick a seriousness level."""
+    # --- Keyword and Pattern Matching (Rule-based) ---
+    if EMERGENCY_KEYWORDS.search(user_input):
         return "Emergency"
-    if high_keywords.search(user_input):
+    if HIGH_KEYWORDS.search(user_input):
         return "High"
     
     # --- Sentiment Analysis (Nuance-based) ---
-    # We only run this if the keywords didn't trigger a High or Emergency level
-    sentiment = analyzer.polarity_scores(user_input)
-    compound_score = sentiment['compound']
-    
     # If the compound sentiment score is very negative, it might be a medium level
     if compound_score <= -0.5:
         return "Medium"
@@ -82,7 +115,7 @@ def get_seriousness_level(user_input, qa_chain_for_llm_check):
         except Exception as e:
             print(f"Error during seriousness check LLM invocation: {e}")
             # Fallback to keyword/sentiment if LLM check fails
-            if medium_keywords.search(user_input):
+            if MEDIUM_KEYWORDS.search(user_input):
                 return "Medium"
 
     # --- Default Level ---
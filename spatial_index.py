@@ -0,0 +1,156 @@
+# spatial_index.py
+
+import heapq
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_unit_vector(lat, lon):
+    """
+    Converts latitude/longitude in degrees to a point on the unit sphere.
+
+    Working in 3D avoids the date-line and pole distortions of indexing raw
+    lat/lon, and straight-line (chord) distance orders points the same way
+    as great-circle distance.
+    """
+    lat_r = math.radians(lat)
+    lon_r = math.radians(lon)
+    cos_lat = math.cos(lat_r)
+    return (cos_lat * math.cos(lon_r), cos_lat * math.sin(lon_r), math.sin(lat_r))
+
+
+def chord_to_km(chord_squared):
+    """Converts a squared chord length on the unit sphere to a great-circle distance in km."""
+    chord = math.sqrt(chord_squared)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Returns the great-circle distance in km between two lat/lon points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GeoIndex:
+    """
+    A KD-tree over lat/lon points for k-nearest-neighbour lookups.
+
+    The tree is built once in O(n log n) and each query visits O(log n)
+    nodes on average. Nodes are stored as tuples to keep the tree compact.
+    """
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries (list): (lat, lon, item) tuples; item is returned by queries.
+        """
+        points = [(to_unit_vector(lat, lon), item) for lat, lon, item in entries]
+        self.size = len(points)
+        self._root = self._build(points, 0)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda p: p[0][axis])
+        middle = len(points) // 2
+        vector, item = points[middle]
+        return (vector, item, axis,
+                self._build(points[:middle], depth + 1),
+                self._build(points[middle + 1:], depth + 1))
+
+    def nearest(self, lat, lon, k=1):
+        """
+        Finds the k items closest to a location.
+
+        Args:
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+            k (int): The number of results.
+
+        Returns:
+            list: (distance_km, item) tuples ordered from nearest to farthest.
+        """
+        if k <= 0 or self._root is None:
+            return []
+        target = to_unit_vector(lat, lon)
+        best = []  # max-heap of (-distance squared, counter, item)
+        counter = 0
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            vector, item, axis, left, right = node
+            dist2 = ((vector[0] - target[0]) ** 2
+                     + (vector[1] - target[1]) ** 2
+                     + (vector[2] - target[2]) ** 2)
+            counter += 1
+            if len(best) < k:
+                heapq.heappush(best, (-dist2, counter, item))
+            elif dist2 < -best[0][0]:
+                heapq.heapreplace(best, (-dist2, counter, item))
+
+            diff = target[axis] - vector[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # Visit the far side only if the splitting plane is closer than the current k-th best
+            if len(best) < k or diff * diff < -best[0][0]:
+                stack.append(far)
+            stack.append(near)
+
+        return [(chord_to_km(-neg_dist2), item) for neg_dist2, _, item in sorted(best, reverse=True)]
+
+
+def brute_force_nearest(entries, lat, lon, k=1):
+    """Reference k-nearest search that scans every entry; used for benchmarking."""
+    scored = [(haversine_km(lat, lon, e_lat, e_lon), item) for e_lat, e_lon, item in entries]
+    return heapq.nsmallest(k, scored, key=lambda pair: pair[0])
+
+
+# Benchmark against brute-force scanning on a synthetic worldwide dataset
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Benchmark GeoIndex against a brute-force scan.")
+    parser.add_argument('--cities', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+
+    def random_point():
+        # Uniform on the sphere rather than uniform in lat/lon
+        return math.degrees(math.asin(rng.uniform(-1, 1))), rng.uniform(-180, 180)
+
+    for n in args.cities:
+        entries = [(*random_point(), i) for i in range(n)]
+        queries = [random_point() for _ in range(args.queries)]
+
+        started = time.perf_counter()
+        index = GeoIndex(entries)
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        indexed = [index.nearest(lat, lon, args.k) for lat, lon in queries]
+        index_s = time.perf_counter() - started
+
+        brute_queries = queries[:max(1, min(len(queries), 2_000_000 // n))]
+        started = time.perf_counter()
+        brute = [brute_force_nearest(entries, lat, lon, args.k) for lat, lon in brute_queries]
+        brute_s = time.perf_counter() - started
+
+        mismatches = sum(
+            [item for _, item in a] != [item for _, item in b]
+            for a, b in zip(indexed, brute)
+        )
+        index_us = index_s / len(queries) * 1e6
+        brute_us = brute_s / len(brute_queries) * 1e6
+        print(f"n={n:>7}  build={build_s * 1000:8.1f} ms  "
+              f"kd-tree={index_us:8.1f} us/query  brute={brute_us:10.1f} us/query  "
+              f"speedup={brute_us / index_us:7.1f}x  mismatches={mismatches}")
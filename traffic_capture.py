@@ -0,0 +1,187 @@
+# traffic_capture.py
+
+import atexit
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+# Endpoints whose traffic is recorded when capture is enabled
+CAPTURED_PATHS = ('/api/chat', '/api/contacts', '/api/contacts/nearby', '/api/university_resources')
+
+# Request fields that must never reach the capture file
+SENSITIVE_KEYS = {'password', 'student_id', 'email', 'token', 'api_key'}
+
+# Location fields are rounded to whole degrees (~100 km) so replay keeps a
+# realistic spread of queries without storing where a user actually is
+COARSE_KEYS = {'lat', 'lon', 'latitude', 'longitude'}
+
+# Fields holding what a user wrote to the chat (including history entries); the
+# text is replaced with neutral filler of the same length so replay keeps request
+# size and token load without storing anyone's disclosures
+MESSAGE_KEYS = {'message', 'user_input', 'history', 'content', 'text'}
+FILLER_TEXT = "i have been thinking about my week and what i would like to talk through today "
+
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+PHONE_PATTERN = re.compile(r'\+?\d[\d\s().-]{6,}\d')
+
+
+def filler_text(length):
+    """Returns neutral filler text of exactly `length` characters."""
+    repeats = length // len(FILLER_TEXT) + 1
+    return (FILLER_TEXT * repeats)[:length]
+
+
+def sanitize_value(value, mask_text=False):
+    """
+    Removes personal details from a captured request body, keeping its shape.
+
+    Args:
+        value: A decoded JSON value (dict, list, str or scalar).
+        mask_text (bool): Replace strings with filler of the same length. It is
+            set for MESSAGE_KEYS values and decided again for each nested key,
+            so e.g. a history entry's "role" is kept and its "content" masked.
+
+    Returns:
+        The same structure with sensitive keys, emails and phone numbers redacted,
+        message text replaced with filler and coordinates rounded to whole degrees.
+    """
+    if isinstance(value, dict):
+        return {key: _sanitize_field(key, item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [sanitize_value(item, mask_text) for item in value]
+    if isinstance(value, str):
+        if mask_text:
+            return filler_text(len(value))
+        value = EMAIL_PATTERN.sub('[email]', value)
+        return PHONE_PATTERN.sub('[phone]', value)
+    return value
+
+
+def _sanitize_field(key, value):
+    key = key.lower()
+    if key in SENSITIVE_KEYS:
+        return '[redacted]'
+    if key in COARSE_KEYS:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(round(value))
+        return '[redacted]'
+    return sanitize_value(value, key in MESSAGE_KEYS)
+
+
+class TrafficRecorder:
+    """
+    Appends captured requests to a JSONL file from a background thread.
+
+    Request handlers only enqueue records, so a slow disk never delays a
+    response. When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, path, max_queue=10000, flush_interval=0.5):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._start()
+        atexit.register(self.close)
+
+    def _start(self):
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='traffic-capture', daemon=True)
+        self._thread.start()
+
+    def after_fork(self):
+        """Restarts the writer in a forked worker; threads and held locks do not survive fork."""
+        self._start()
+
+    def record(self, entry):
+        """Queues a record for writing without blocking the caller."""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self):
+        lines = []
+        while True:
+            try:
+                lines.append(json.dumps(self._queue.get_nowait()) + '\n')
+            except queue.Empty:
+                break
+        if lines:
+            # A single append per batch keeps lines from concurrent workers intact
+            with open(self.path, 'a') as f:
+                f.write(''.join(lines))
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self._drain()
+            except OSError as e:
+                print(f"Traffic capture write failed: {e}")
+
+    def close(self):
+        """Stops the writer thread and flushes anything still queued."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=2)
+        try:
+            self._drain()
+        except OSError as e:
+            print(f"Traffic capture write failed: {e}")
+        if self.dropped:
+            print(f"Traffic capture dropped {self.dropped} records (queue full)")
+
+
+def install_capture(app, path=None):
+    """
+    Registers request hooks on a Flask app that record captured endpoints.
+
+    Capture is enabled by passing a path or by setting TRAFFIC_CAPTURE_FILE.
+
+    Args:
+        app (Flask): The application to instrument.
+        path (str): Optional JSONL output path overriding the environment.
+
+    Returns:
+        TrafficRecorder: The recorder in use, or None if capture is disabled.
+    """
+    path = path or os.getenv('TRAFFIC_CAPTURE_FILE')
+    if not path:
+        return None
+
+    from flask import g, request
+
+    recorder = TrafficRecorder(path)
+
+    @app.before_request
+    def _start_capture_timer():
+        if request.path in CAPTURED_PATHS:
+            # Replay schedules on arrival time, so take the wall clock here, not at completion
+            g.capture_arrived = time.time()
+            g.capture_started = time.perf_counter()
+
+    @app.after_request
+    def _capture_request(response):
+        started = g.pop('capture_started', None)
+        if started is None:
+            return response
+        body = request.get_json(silent=True)
+        recorder.record({
+            'ts': g.pop('capture_arrived'),
+            'method': request.method,
+            'path': request.path,
+            'body': sanitize_value(body) if body is not None else None,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'input_tokens': g.get('input_tokens'),
+            'input_tokens_source': g.get('input_tokens_source'),
+        })
+        return response
+
+    print(f"Traffic capture enabled, writing to {path}")
+    return recorder
@@ -3,6 +3,8 @@
 import json
 import os
 
+from university_directory import SHARD_DIR, INDEX_FILE_NAME, UniversityDirectory, normalize_name, suggest_names
+
 # Define the paths to the data files
 UNIVERSITY_DATA_FILE = os.path.join(os.path.dirname(__file__), 'university_data.json')
 UNIVERSITY_STUDENTS_FILE = os.path.join(os.path.dirname(__file__), 'university_students.json')
@@ -20,25 +22,54 @@ def load_university_data():
         print(f"Error: A university data file was not found. Please create {e.filename}")
         return {}, {}
 
-# Load initial data
-UNIVERSITY_RESOURCES, UNIVERSITY_STUDENTS = load_university_data()
+def load_university_directory():
+    """
+    Opens the sharded university directory if it has been migrated.
+
+    The location can be overridden with UNIVERSITY_SHARD_DIR and the number of
+    hot universities kept in memory with UNIVERSITY_CACHE_SIZE.
+
+    Returns:
+        UniversityDirectory: The directory, or None to use the monolithic JSON files.
+    """
+    shard_dir = os.getenv('UNIVERSITY_SHARD_DIR', SHARD_DIR)
+    if not os.path.exists(os.path.join(shard_dir, INDEX_FILE_NAME)):
+        return None
+    cache_size = int(os.getenv('UNIVERSITY_CACHE_SIZE', '64'))
+    return UniversityDirectory(shard_dir, cache_size=cache_size)
+
+# Load initial data; the monolithic files are only read when no shards exist
+UNIVERSITY_DIRECTORY = load_university_directory()
+if UNIVERSITY_DIRECTORY is None:
+    UNIVERSITY_RESOURCES, UNIVERSITY_STUDENTS = load_university_data()
+else:
+    UNIVERSITY_RESOURCES, UNIVERSITY_STUDENTS = {}, {}
 
 def authenticate_student(university_name, student_id, password):
     """
     Authenticates a student against the mock student data.
+
+    The university must match exactly or by a known alias; typos are never
+    guessed here, so a login is only checked against the university the
+    student actually named.
     
     Args:
-        university_name (str): The name of the university.
+        university_name (str): The name or alias of the university.
         student_id (str): The student's ID.
         password (str): The password.
         
     Returns:
         tuple: (success (bool), message (str))
     """
-    if university_name not in UNIVERSITY_STUDENTS:
+    if UNIVERSITY_DIRECTORY is not None:
+        students = UNIVERSITY_DIRECTORY.get_students(university_name)
+        if students is None:
+            return False, "University not found."
+    elif university_name not in UNIVERSITY_STUDENTS:
         return False, "University not found."
-    
-    students = UNIVERSITY_STUDENTS[university_name].get("students", {})
+    else:
+        students = UNIVERSITY_STUDENTS[university_name].get("students", {})
+
     if student_id not in students:
         return False, "Invalid Student ID."
         
@@ -58,6 +89,26 @@ def get_university_resources(university_name):
     Returns:
         dict: A dictionary of resources. Returns an empty dict if not found.
     """
+    if UNIVERSITY_DIRECTORY is not None:
+        # Shards are re-read when their file changes, so edits are still picked up
+        return UNIVERSITY_DIRECTORY.get_resources(university_name)
+
     # Reload data to get latest changes
     university_resources, _ = load_university_data()
     return university_resources.get(university_name, {})
+
+def suggest_universities(university_name, limit=3):
+    """
+    Suggests listed universities for a name that was not found.
+
+    Args:
+        university_name (str): The name as typed by the user.
+        limit (int): Maximum number of suggestions.
+
+    Returns:
+        list: Canonical university names for a "did you mean" prompt.
+    """
+    if UNIVERSITY_DIRECTORY is not None:
+        return UNIVERSITY_DIRECTORY.suggest(university_name, limit)
+    university_resources, _ = load_university_data()
+    return suggest_names(university_name, {normalize_name(name): name for name in university_resources}, limit)
@@ -0,0 +1,303 @@
+# university_directory.py
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Default location of the sharded directory (one JSON file per university)
+SHARD_DIR = os.path.join(os.path.dirname(__file__), 'university_shards')
+INDEX_FILE_NAME = 'index.json'
+
+# Words ignored when building aliases, e.g. "University of Oxford" -> "oxford"
+STOP_WORDS = {
+    'the', 'of', 'at', 'and', 'university', 'college', 'institute',
+    'de', 'del', 'des', 'du', 'la', 'le', 'universite', 'universidad', 'universita', 'universitat',
+}
+
+# Names that are spelled close to a listed university but are a different
+# institution; check_directory() fails if any of them resolves
+NEAR_MISS_NAMES = ['University of Tokyo']
+
+
+def normalize_name(name):
+    """
+    Normalizes a university name for index lookups.
+
+    Accents are folded ("Montréal" -> "montreal") while letters from any
+    script are kept, so names such as "서울대학교" still get a key.
+
+    Args:
+        name (str): A university name or alias as typed by a user.
+
+    Returns:
+        str: Casefolded words separated by single spaces, punctuation removed,
+            or an empty string for anything that is not a non-empty string.
+    """
+    if not name or not isinstance(name, str):
+        return ''
+    # Drop accents on Latin letters only; marks such as Japanese dakuten change
+    # the meaning of the character and are kept.
+    kept = []
+    base_is_latin = False
+    for ch in unicodedata.normalize('NFKD', name):
+        if unicodedata.combining(ch):
+            if not base_is_latin:
+                kept.append(ch)
+            continue
+        base_is_latin = unicodedata.name(ch, '').startswith('LATIN')
+        kept.append(ch)
+    # Recompose so scripts that NFKD splits apart (e.g. Hangul) match typed input
+    folded = unicodedata.normalize('NFKC', ''.join(kept)).casefold()
+    return ' '.join(re.findall(r'[^\W_]+', folded))
+
+
+def generate_aliases(name):
+    """
+    Builds the default lookup aliases for a university name.
+
+    Args:
+        name (str): The canonical university name.
+
+    Returns:
+        list: Normalized aliases, including the name without filler words and its acronym.
+    """
+    normalized = normalize_name(name)
+    words = normalized.split()
+    aliases = [normalized]
+    significant = [word for word in words if word not in STOP_WORDS]
+    if significant and significant != words:
+        aliases.append(' '.join(significant))
+    # Two-letter acronyms ("ut", "hu") collide too easily to be useful
+    acronym_words = [word for word in words if word not in {'the', 'of', 'at', 'and'}]
+    if len(acronym_words) > 2:
+        aliases.append(''.join(word[0] for word in acronym_words))
+    return list(dict.fromkeys(aliases))
+
+
+def shard_file_name(name):
+    """
+    Returns a stable shard file name for a university.
+
+    The name is an ASCII slug (when the name has one) plus a hash of the exact
+    canonical name, e.g. "seoul-national-university-3f2a9c1e.json", so names
+    in any script get distinct, filesystem-safe files.
+    """
+    slug = '-'.join(re.findall(r'[a-z0-9]+', normalize_name(name)))[:60]
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]
+    return f"{slug}-{digest}.json" if slug else f"{digest}.json"
+
+
+class UniversityDirectory:
+    """
+    University resources and student credentials stored one shard per university.
+
+    Only the small alias index is loaded up front. Shards are read on demand
+    and kept in an LRU of hot universities, so memory stays bounded no matter
+    how many institutions are on disk. A shard is re-read if its file changes.
+    """
+
+    def __init__(self, shard_dir=SHARD_DIR, cache_size=64):
+        self.shard_dir = shard_dir
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        with open(os.path.join(shard_dir, INDEX_FILE_NAME), 'r') as f:
+            index = json.load(f)
+        self.names = index['universities']
+        self.aliases = index['aliases']
+
+    def resolve(self, university_name):
+        """
+        Resolves a user-supplied name or alias to a canonical university name.
+
+        Only exact names and known aliases resolve. Close spellings are often a
+        different institution ("University of Tokyo" vs "University of Toronto"),
+        so typos are left to suggest() and never acted on.
+
+        Args:
+            university_name (str): The name as typed by the user.
+
+        Returns:
+            str: The canonical name, or None if nothing matches.
+        """
+        if university_name in self.names:
+            return university_name
+        key = normalize_name(university_name)
+        if not key:
+            return None
+        return self.aliases.get(key)
+
+    def suggest(self, university_name, limit=3):
+        """
+        Lists universities spelled close to a name that did not resolve.
+
+        Args:
+            university_name (str): The name as typed by the user.
+            limit (int): Maximum number of suggestions.
+
+        Returns:
+            list: Canonical names for a "did you mean" prompt, best match first.
+        """
+        return suggest_names(university_name, self.aliases, limit)
+
+    def _load_shard(self, name):
+        path = os.path.join(self.shard_dir, self.names[name])
+        mtime = os.stat(path).st_mtime
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(name)
+                return cached[1]
+        with open(path, 'r') as f:
+            shard = json.load(f)
+        with self._lock:
+            self._cache[name] = (mtime, shard)
+            self._cache.move_to_end(name)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return shard
+
+    def get_shard(self, university_name):
+        """
+        Retrieves the shard for a university, resolving aliases.
+
+        Args:
+            university_name (str): A university name or alias.
+
+        Returns:
+            dict: The shard with "name", "resources" and "students", or None if not found.
+        """
+        name = self.resolve(university_name)
+        if name is None:
+            return None
+        try:
+            return self._load_shard(name)
+        except FileNotFoundError:
+            print(f"Error: Shard for '{name}' is missing from {self.shard_dir}")
+            return None
+
+    def get_resources(self, university_name):
+        """Returns the resources for a university, or an empty dict if not found."""
+        shard = self.get_shard(university_name)
+        return shard.get('resources', {}) if shard else {}
+
+    def get_students(self, university_name):
+        """Returns the student records for a university, or None if the university is unknown."""
+        shard = self.get_shard(university_name)
+        return shard.get('students', {}) if shard else None
+
+
+def suggest_names(university_name, aliases, limit=3, cutoff=0.8):
+    """
+    Finds canonical names whose aliases are close to a user-supplied name.
+
+    Args:
+        university_name (str): The name as typed by the user.
+        aliases (dict): Normalized alias -> canonical name.
+        limit (int): Maximum number of suggestions.
+        cutoff (float): Minimum difflib similarity ratio.
+
+    Returns:
+        list: Distinct canonical names, best match first.
+    """
+    key = normalize_name(university_name)
+    if not key:
+        return []
+    suggestions = []
+    for match in difflib.get_close_matches(key, aliases.keys(), n=limit * 3, cutoff=cutoff):
+        if aliases[match] not in suggestions:
+            suggestions.append(aliases[match])
+    return suggestions[:limit]
+
+
+def check_directory(shard_dir=SHARD_DIR):
+    """
+    Verifies that every university resolves to itself and no near-miss name resolves.
+
+    Args:
+        shard_dir (str): The shard directory to check.
+
+    Raises:
+        ValueError: If a lookup returns the wrong university.
+    """
+    directory = UniversityDirectory(shard_dir)
+    for name in directory.names:
+        if directory.resolve(name) != name:
+            raise ValueError(f"'{name}' resolves to '{directory.resolve(name)}'")
+    for name in NEAR_MISS_NAMES:
+        if name not in directory.names and directory.resolve(name) is not None:
+            raise ValueError(f"'{name}' is not listed but resolves to '{directory.resolve(name)}'")
+
+
+def migrate_json_files(resources_file, students_file, shard_dir=SHARD_DIR):
+    """
+    Splits the monolithic university JSON files into per-university shards.
+
+    Args:
+        resources_file (str): Path to university_data.json.
+        students_file (str): Path to university_students.json.
+        shard_dir (str): Output directory for the shards and index.
+
+    Returns:
+        int: The number of shards written.
+
+    Raises:
+        ValueError: If two universities map to the same shard file name.
+    """
+    with open(resources_file, 'r') as f:
+        resources = json.load(f)
+    with open(students_file, 'r') as f:
+        students = json.load(f)
+
+    all_names = list(resources) + [n for n in students if n not in resources]
+    file_owners = {}
+    for name in all_names:
+        file_name = shard_file_name(name)
+        if file_name in file_owners:
+            raise ValueError(f"Shard file name collision: '{file_owners[file_name]}' and '{name}' -> {file_name}")
+        file_owners[file_name] = name
+
+    os.makedirs(shard_dir, exist_ok=True)
+    names = {}
+    alias_owners = {}
+    for name in all_names:
+        file_name = shard_file_name(name)
+        shard = {
+            'name': name,
+            'resources': resources.get(name, {}),
+            'students': students.get(name, {}).get('students', {}),
+        }
+        with open(os.path.join(shard_dir, file_name), 'w') as f:
+            json.dump(shard, f, indent=4)
+        names[name] = file_name
+        for alias in generate_aliases(name):
+            alias_owners.setdefault(alias, set()).add(name)
+
+    # Drop aliases shared by several universities rather than guess between them;
+    # those universities still resolve by their exact canonical name.
+    aliases = {alias: next(iter(owners)) for alias, owners in alias_owners.items()
+               if alias and len(owners) == 1}
+
+    with open(os.path.join(shard_dir, INDEX_FILE_NAME), 'w') as f:
+        json.dump({'universities': names, 'aliases': aliases}, f, indent=4, sort_keys=True)
+    return len(names)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    base_dir = os.path.dirname(__file__)
+    parser = argparse.ArgumentParser(description="Migrate university JSON files to a sharded directory.")
+    parser.add_argument('--resources', default=os.path.join(base_dir, 'university_data.json'))
+    parser.add_argument('--students', default=os.path.join(base_dir, 'university_students.json'))
+    parser.add_argument('--out', default=SHARD_DIR, help="Output shard directory")
+    args = parser.parse_args()
+
+    count = migrate_json_files(args.resources, args.students, args.out)
+    check_directory(args.out)
+    print(f"Wrote {count} university shards to {args.out}")